@@ -0,0 +1,296 @@
+from fastapi import HTTPException
+from functools import lru_cache
+from typing import AsyncIterator, Mapping, Optional
+from types import MappingProxyType
+from weakref import WeakValueDictionary
+from cachetools import TTLCache
+import asyncio
+import hashlib
+import os
+import random
+import re
+import httpx
+import orjson
+
+from models import ProductoEntradaInteligente
+
+# Sesiones por usuario; la clave es un hash para no guardar el nombre en claro.
+# Con REDIS_URL se guardan en Redis y las comparten todos los workers; sin él se
+# usa esta caché en memoria, válida para despliegues de un solo proceso.
+SESION_TTL = 3600
+REDIS_URL = os.environ.get("REDIS_URL")
+user_context = TTLCache(maxsize=10_000, ttl=SESION_TTL)
+_ctx_lock = asyncio.Lock()
+_redis = None
+# (businessId, nombre normalizado) -> candado; se libera solo cuando nadie lo usa
+_categoria_locks = WeakValueDictionary()
+# Tope global de altas de producto simultáneas contra Tecopos
+_crear_sem = asyncio.Semaphore(3)
+# businessId -> {nombre normalizado: id}
+_cat_cache = TTLCache(maxsize=1024, ttl=300)
+# (url, params, businessId) -> (ETag, ..., {nombre normalizado: id}) de los listados
+_etag_cache = TTLCache(maxsize=1024, ttl=3600)
+
+REINTENTOS = 3
+# Los PATCH de este servicio fijan valores absolutos, así que repetirlos es seguro
+_IDEMPOTENTES = frozenset({"GET", "PATCH"})
+
+async def solicitar(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> httpx.Response:
+    # Reintenta con backoff exponencial y jitter. Los fallos de conexión y los 429 se
+    # reintentan siempre (Tecopos no llegó a procesar la petición); los timeouts de
+    # lectura y los 5xx solo en métodos idempotentes, para no duplicar altas.
+    reintentable = method in _IDEMPOTENTES
+    for intento in range(REINTENTOS):
+        ultimo = intento == REINTENTOS - 1
+        try:
+            res = await client.request(method, url, **kwargs)
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            if ultimo:
+                raise
+        except httpx.ReadTimeout:
+            if ultimo or not reintentable:
+                raise
+        else:
+            limitado = res.status_code == 429
+            if ultimo or not (limitado or (res.status_code >= 500 and reintentable)):
+                return res
+            await res.aclose()
+        await asyncio.sleep(0.1 * 2 ** intento + random.random() * 0.05)
+
+BASE_URLS = {"apidev": "https://apidev.tecopos.com"}
+
+def get_base_url(region: str) -> str:
+    # La región ya viene validada por LoginData
+    return BASE_URLS[region]
+
+BASE_HEADERS = MappingProxyType({
+    "Content-Type": "application/json",
+    "Accept": "*/*",
+    "Origin": "https://admindev.tecopos.com",
+    "Referer": "https://admindev.tecopos.com/",
+    "x-app-origin": "Tecopos-Admin",
+    "User-Agent": "Mozilla/5.0"
+})
+
+def get_auth_headers(token: str, businessid: int) -> Mapping[str, str]:
+    # Solo lectura: se comparte tal cual entre las llamadas concurrentes de la sesión
+    return MappingProxyType({**BASE_HEADERS, "Authorization": f"Bearer {token}", "x-app-businessid": str(businessid)})
+
+def _ctx_key(usuario: str) -> str:
+    return hashlib.blake2b(usuario.encode(), digest_size=16).hexdigest()
+
+async def conectar_sesiones() -> None:
+    global _redis
+    if REDIS_URL:
+        import redis.asyncio as redis
+
+        _redis = redis.from_url(REDIS_URL)
+
+async def cerrar_sesiones() -> None:
+    if _redis is not None:
+        await _redis.aclose()
+
+async def obtener_contexto(usuario: str) -> Optional[dict]:
+    if _redis is None:
+        return user_context.get(_ctx_key(usuario))
+
+    guardado = await _redis.get(f"ctx:{_ctx_key(usuario)}")
+    if guardado is None:
+        return None
+    ctx = orjson.loads(guardado)
+    ctx["headers"] = MappingProxyType(ctx["headers"])
+    return ctx
+
+async def guardar_contexto(usuario: str, ctx: dict) -> None:
+    if _redis is None:
+        async with _ctx_lock:
+            user_context[_ctx_key(usuario)] = ctx
+        return
+
+    # SET con EX guarda y pone la caducidad en una sola operación
+    guardado = orjson.dumps({**ctx, "headers": dict(ctx["headers"])})
+    await _redis.set(f"ctx:{_ctx_key(usuario)}", guardado, ex=SESION_TTL)
+
+def normalizar(texto: str) -> str:
+    return texto.strip().lower()
+
+def indexar_por_nombre(items: list) -> dict[str, int]:
+    # Ante nombres repetidos se queda el primero, igual que la búsqueda lineal que reemplaza
+    indice = {}
+    for item in items:
+        indice.setdefault(normalizar(item.get("name", "")), item["id"])
+    return indice
+
+# Palabras clave por categoría, en orden de prioridad: si un nombre coincide con
+# varias gana la primera de esta tabla
+PALABRAS_POR_CATEGORIA = (
+    ("Bebidas Alcohólicas", ("cerveza", "ron", "vino")),
+    ("Refrescos", ("refresco", "soda", "jugos")),
+)
+CATEGORIA_POR_DEFECTO = "Mercado"
+
+# Todas las palabras en un solo patrón, con un grupo por categoría (c0, c1, ...)
+_CAT_RE = re.compile(
+    "|".join(
+        f"(?P<c{i}>{'|'.join(map(re.escape, palabras))})"
+        for i, (_, palabras) in enumerate(PALABRAS_POR_CATEGORIA)
+    ),
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=4096)
+def inferir_categoria(nombre: str) -> str:
+    encontradas = [int(m.lastgroup[1:]) for m in _CAT_RE.finditer(nombre)]
+    if not encontradas:
+        return CATEGORIA_POR_DEFECTO
+    return PALABRAS_POR_CATEGORIA[min(encontradas)][0]
+
+async def obtener_indice(client: httpx.AsyncClient, url: str, headers: Mapping[str, str], params: Optional[dict] = None) -> Optional[dict]:
+    # GET condicional: si Tecopos responde 304 se reutiliza el índice ya construido
+    # sin descargar ni parsear el listado. Devuelve None si la consulta falla.
+    clave = (url, tuple(sorted((params or {}).items())), headers.get("x-app-businessid"))
+    guardado = _etag_cache.get(clave)
+    if guardado:
+        headers = {**headers, "If-None-Match": guardado[0]}
+
+    res = await solicitar(client, "GET", url, params=params, headers=headers)
+    if res.status_code == 304 and guardado:
+        return dict(guardado[1])
+    if res.status_code != 200:
+        return None
+
+    indice = indexar_por_nombre(orjson.loads(res.content).get("items", []))
+    etag = res.headers.get("ETag")
+    if etag:
+        _etag_cache[clave] = (etag, indice)
+    return dict(indice)
+
+async def obtener_o_crear_categoria(nombre_categoria: str, businessid: int, client: httpx.AsyncClient, base_url: str, headers: Mapping[str, str]) -> int:
+    # Serializado por categoría para que dos productos nuevos no la creen a la vez;
+    # categorías distintas se resuelven en paralelo
+    lock = _categoria_locks.setdefault((businessid, normalizar(nombre_categoria)), asyncio.Lock())
+    async with lock:
+        return await _obtener_o_crear_categoria(nombre_categoria, businessid, client, base_url, headers)
+
+async def _obtener_o_crear_categoria(nombre_categoria: str, businessid: int, client: httpx.AsyncClient, base_url: str, headers: Mapping[str, str]) -> int:
+    nombre_norm = normalizar(nombre_categoria)
+    indice = _cat_cache.get(businessid)
+    if indice is not None and nombre_norm in indice:
+        return indice[nombre_norm]
+
+    # Solo se piden al servidor las categorías que coinciden con el nombre; si el
+    # servidor ignora el filtro llega la lista completa y el resultado es el mismo
+    cat_url = f"{base_url}/api/v1/administration/salescategory"
+    encontradas = await obtener_indice(client, cat_url, headers, params={"search": nombre_categoria})
+    if encontradas is None:
+        raise HTTPException(status_code=500, detail="No se pudieron consultar las categorías")
+
+    # Otra categoría del mismo negocio pudo crear el índice mientras se esperaba
+    indice = _cat_cache.get(businessid)
+    if indice is None:
+        indice = _cat_cache[businessid] = {}
+    for nombre, categoria_id in encontradas.items():
+        indice.setdefault(nombre, categoria_id)
+    if nombre_norm in indice:
+        return indice[nombre_norm]
+
+    crear_res = await solicitar(client, "POST", cat_url, headers=headers, content=orjson.dumps({"name": nombre_categoria}))
+    if crear_res.status_code not in [200, 201]:
+        raise HTTPException(status_code=500, detail="No se pudo crear la categoría")
+
+    categoria_id = orjson.loads(crear_res.content).get("id")
+    indice[nombre_norm] = categoria_id
+    return categoria_id
+
+POR_PAGINA = 200
+
+async def recorrer_productos(client: httpx.AsyncClient, base_url: str, headers: Mapping[str, str], params: Optional[dict] = None) -> AsyncIterator[list]:
+    # Devuelve el catálogo página a página pidiendo la siguiente mientras se procesa
+    # la actual; si la respuesta no trae totalPages se asume que vino todo en una sola
+    productos_url = f"{base_url}/api/v1/administration/product"
+
+    async def _pagina(pagina: int) -> httpx.Response:
+        return await solicitar(client, "GET", productos_url, params={**(params or {}), "page": pagina, "per_page": POR_PAGINA}, headers=headers)
+
+    pagina = 1
+    siguiente = asyncio.create_task(_pagina(pagina))
+    try:
+        while siguiente is not None:
+            res = await siguiente
+            if res.status_code != 200:
+                raise HTTPException(status_code=500, detail="Error al obtener productos")
+            cuerpo = orjson.loads(res.content)
+            total_paginas = cuerpo.get("totalPages") or 1
+            siguiente = asyncio.create_task(_pagina(pagina + 1)) if pagina < total_paginas else None
+            pagina += 1
+            yield cuerpo.get("items", [])
+    finally:
+        if siguiente is not None:
+            siguiente.cancel()
+
+async def _indice_pagina(client: httpx.AsyncClient, productos_url: str, headers: Mapping[str, str], pagina: int) -> tuple[int, dict]:
+    # GET condicional por página; de cada una se guarda solo el total de páginas y
+    # su índice de nombres, no los productos completos
+    params = {"page": pagina, "per_page": POR_PAGINA}
+    clave = (productos_url, tuple(sorted(params.items())), headers.get("x-app-businessid"))
+    guardado = _etag_cache.get(clave)
+    if guardado:
+        headers = {**headers, "If-None-Match": guardado[0]}
+
+    res = await solicitar(client, "GET", productos_url, params=params, headers=headers)
+    if res.status_code == 304 and guardado:
+        return guardado[1], guardado[2]
+    if res.status_code != 200:
+        raise HTTPException(status_code=500, detail="Error al obtener productos")
+
+    cuerpo = orjson.loads(res.content)
+    total_paginas = cuerpo.get("totalPages") or 1
+    indice = indexar_por_nombre(cuerpo.get("items", []))
+    etag = res.headers.get("ETag")
+    if etag:
+        _etag_cache[clave] = (etag, total_paginas, indice)
+    return total_paginas, indice
+
+async def obtener_indice_productos(client: httpx.AsyncClient, base_url: str, headers: Mapping[str, str]) -> dict:
+    # Se leen todas las páginas: un producto que no esté en la primera también existe
+    # y no debe volver a crearse. La primera da el total y el resto se pide a la vez.
+    productos_url = f"{base_url}/api/v1/administration/product"
+    total_paginas, primera = await _indice_pagina(client, productos_url, headers, 1)
+    sem = asyncio.Semaphore(8)
+
+    async def _pagina(pagina: int) -> dict:
+        async with sem:
+            return (await _indice_pagina(client, productos_url, headers, pagina))[1]
+
+    resto = await asyncio.gather(*[_pagina(n) for n in range(2, total_paginas + 1)])
+    indice = dict(primera)
+    for pagina in resto:
+        for nombre, producto_id in pagina.items():
+            indice.setdefault(nombre, producto_id)
+    return indice
+
+async def buscar_o_crear_producto(producto: ProductoEntradaInteligente, indice: dict, businessid: int, client: httpx.AsyncClient, base_url: str, headers: Mapping[str, str]) -> int:
+    nombre_norm = normalizar(producto.nombre)
+    existente = indice.get(nombre_norm)
+    if existente:
+        return existente
+
+    categoria_id = await obtener_o_crear_categoria(inferir_categoria(producto.nombre), businessid, client, base_url, headers)
+
+    crear_url = f"{base_url}/api/v1/administration/product"
+    crear_payload = {
+        "type": "STOCK",
+        "name": producto.nombre,
+        "prices": [{"price": producto.precio, "codeCurrency": producto.moneda, "systemPriceId": 1}],
+        "images": [],
+        "salesCategoryId": categoria_id
+    }
+
+    async with _crear_sem:
+        crear_res = await solicitar(client, "POST", crear_url, headers=headers, content=orjson.dumps(crear_payload))
+    if crear_res.status_code not in [200, 201]:
+        raise HTTPException(status_code=500, detail=f"No se pudo crear '{producto.nombre}'")
+
+    producto_id = orjson.loads(crear_res.content).get("id")
+    indice[nombre_norm] = producto_id
+    return producto_id
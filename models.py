@@ -0,0 +1,61 @@
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Literal, Optional, List
+
+# Los cuerpos de petición no se modifican después de validarse
+CONFIG_PETICION = ConfigDict(frozen=True, extra="ignore")
+
+class LoginData(BaseModel):
+    model_config = CONFIG_PETICION
+
+    usuario: str
+    password: str
+    region: Literal["apidev"] = "apidev"
+
+class Producto(BaseModel):
+    model_config = CONFIG_PETICION
+
+    nombre: str
+    precio: float
+    costo: float | None = None
+    moneda: str = Field(default="USD")
+    tipo: str = Field(default="STOCK")
+    categorias: List[str] = Field(default_factory=list)
+    usuario: str
+
+class CambioMonedaRequest(BaseModel):
+    model_config = CONFIG_PETICION
+
+    usuario: str
+    moneda_actual: str
+    nueva_moneda: str
+    confirmar: bool = False
+    forzar_todos: bool = False
+
+class ProductoEntradaInteligente(BaseModel):
+    model_config = CONFIG_PETICION
+
+    nombre: str
+    cantidad: int
+    precio: float
+    moneda: str = "CUP"
+
+    @field_validator("cantidad", mode="after")
+    @classmethod
+    def validar_cantidad_positiva(cls, v):
+        if v <= 0:
+            raise ValueError("La cantidad debe ser mayor que cero")
+        return v
+
+    @field_validator("nombre", mode="after")
+    @classmethod
+    def validar_nombre_no_vacio(cls, v):
+        if not v.strip():
+            raise ValueError("El nombre del producto no puede estar vacío")
+        return v
+
+class EntradaInteligenteRequest(BaseModel):
+    model_config = CONFIG_PETICION
+
+    usuario: str
+    stockAreaId: Optional[int] = 0
+    productos: List[ProductoEntradaInteligente]
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException, Request
+import orjson
+
+from helpers import BASE_HEADERS, get_auth_headers, get_base_url, guardar_contexto, solicitar
+from models import LoginData
+
+router = APIRouter()
+
+@router.post("/login-tecopos")
+async def login_tecopos(data: LoginData, request: Request):
+    client = request.app.state.http
+    base_url = get_base_url(data.region)
+    login_url = f"{base_url}/api/v1/security/login"
+    userinfo_url = f"{base_url}/api/v1/security/user"
+
+    res = await solicitar(client, "POST", login_url, content=orjson.dumps({"username": data.usuario, "password": data.password}), headers=BASE_HEADERS)
+    if res.status_code != 200:
+        raise HTTPException(status_code=401, detail="Credenciales inválidas")
+
+    token = orjson.loads(res.content).get("token")
+    headers = {**BASE_HEADERS, "Authorization": f"Bearer {token}"}
+
+    info = await solicitar(client, "GET", userinfo_url, headers=headers)
+    businessid = orjson.loads(info.content).get("businessId")
+
+    if not token or not businessid:
+        raise HTTPException(status_code=400, detail="No se pudo obtener token o businessId")
+
+    await guardar_contexto(data.usuario, {
+        "token": token,
+        "businessId": businessid,
+        "region": data.region,
+        "base_url": base_url,
+        "headers": get_auth_headers(token, businessid)
+    })
+
+    return {"status": "ok", "mensaje": "Login exitoso", "businessid": businessid}
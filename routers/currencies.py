@@ -0,0 +1,150 @@
+from fastapi import APIRouter, HTTPException, Request
+import asyncio
+import httpx
+import logging
+import orjson
+
+from helpers import obtener_contexto, recorrer_productos, solicitar
+from models import CambioMonedaRequest
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 50
+# base_url -> si su PATCH masivo sirve; lo decide la primera prueba concluyente y no
+# se vuelve a probar. Un 429 o un 5xx no concluyen nada y el siguiente lote prueba otra vez.
+_bulk_soportado = {}
+_BULK_AUSENTE = frozenset({404, 405, 501})
+
+def _ids_confirmados(res: httpx.Response) -> set:
+    # Solo cuentan los productos que la respuesta devuelve; un 204 o un cuerpo sin
+    # ellos no confirma nada
+    try:
+        cuerpo = orjson.loads(res.content) if res.content else None
+    except orjson.JSONDecodeError:
+        return set()
+    items = cuerpo.get("items") if isinstance(cuerpo, dict) else cuerpo
+    if not isinstance(items, list):
+        return set()
+    return {item.get("id") for item in items if isinstance(item, dict)}
+
+@router.post("/actualizar-monedas")
+async def actualizar_monedas(data: CambioMonedaRequest, request: Request):
+    client = request.app.state.http
+    ctx = await obtener_contexto(data.usuario)
+    if not ctx:
+        raise HTTPException(status_code=403, detail="Usuario no autenticado")
+
+    base_url = ctx["base_url"]
+    headers = ctx["headers"]
+
+    pendientes = []
+
+    def _filtrar(p: dict):
+        for precio in p.get("prices", []):
+            if precio.get("codeCurrency") == data.moneda_actual:
+                pendientes.append({
+                    "id": p["id"],
+                    "nombre": p["name"],
+                    "price": precio["price"],
+                    "systemPriceId": precio.get("systemPriceId", 1)
+                })
+
+    # Se pide primero el filtro por moneda al servidor; si no lo acepta se trae el
+    # catálogo completo. En ambos casos se filtra aquí también, así que un servidor
+    # que ignore el parámetro sigue dando el resultado correcto.
+    for filtro in ({"codeCurrency": data.moneda_actual}, {}):
+        recibidas = 0
+        try:
+            async for items in recorrer_productos(client, base_url, headers, params=filtro):
+                recibidas += 1
+                for p in items:
+                    _filtrar(p)
+            break
+        except HTTPException:
+            # Solo se reintenta sin filtro si falló la primera página
+            if recibidas or not filtro:
+                raise
+
+    if not data.confirmar:
+        return {
+            "status": "ok",
+            "mensaje": "Simulación de cambio de moneda",
+            "productos_para_cambiar": pendientes
+        }
+
+    sem = asyncio.Semaphore(8)
+
+    def _precios(prod: dict) -> list:
+        return [
+            {
+                "systemPriceId": prod["systemPriceId"],
+                "price": prod["price"],
+                "codeCurrency": data.nueva_moneda
+            }
+        ]
+
+    async def _patch(prod: dict):
+        patch_url = f"{base_url}/api/v1/administration/product/{prod['id']}"
+        patch_payload = {"prices": _precios(prod)}
+        async with sem:
+            return await solicitar(client, "PATCH", patch_url, headers=headers, content=orjson.dumps(patch_payload))
+
+    async def _patch_lote(lote: list) -> tuple[list, list]:
+        confirmados = set()
+        soportado = _bulk_soportado.get(base_url)
+        if soportado is not False:
+            bulk_url = f"{base_url}/api/v1/administration/product/bulk"
+            bulk_payload = orjson.dumps({"items": [{"id": p["id"], "prices": _precios(p)} for p in lote]})
+            try:
+                async with sem:
+                    if soportado:
+                        bulk_res = await solicitar(client, "PATCH", bulk_url, headers=headers, content=bulk_payload)
+                    else:
+                        # La prueba va sin reintentos; si falla, el lote sigue producto a producto
+                        bulk_res = await client.request("PATCH", bulk_url, headers=headers, content=bulk_payload)
+            except httpx.HTTPError:
+                bulk_res = None
+            if bulk_res is not None and bulk_res.is_success:
+                confirmados = _ids_confirmados(bulk_res)
+                if soportado is None:
+                    _bulk_soportado[base_url] = bool(confirmados)
+            elif bulk_res is not None and bulk_res.status_code in _BULK_AUSENTE:
+                _bulk_soportado[base_url] = False
+
+        # Lo que el PATCH masivo no confirmó se actualiza producto a producto
+        nombres = [p["nombre"] for p in lote if p["id"] in confirmados]
+        fallidos = []
+        individuales = [p for p in lote if p["id"] not in confirmados]
+        resultados = await asyncio.gather(*[_patch(p) for p in individuales], return_exceptions=True)
+        for prod, resultado in zip(individuales, resultados):
+            if isinstance(resultado, BaseException):
+                logger.error("Fallo al actualizar '%s'", prod["nombre"], exc_info=resultado)
+                fallidos.append(prod["nombre"])
+            elif resultado.status_code in [200, 204]:
+                nombres.append(prod["nombre"])
+            else:
+                fallidos.append(prod["nombre"])
+        return nombres, fallidos
+
+    # El primer lote decide si hay PATCH masivo; los demás se envían a la vez y el
+    # semáforo compartido limita las peticiones en vuelo
+    lotes = [pendientes[i:i + TAMANO_LOTE] for i in range(0, len(pendientes), TAMANO_LOTE)]
+    resultados = [await _patch_lote(lotes[0])] if lotes else []
+    resultados += await asyncio.gather(*[_patch_lote(lote) for lote in lotes[1:]])
+
+    actualizados = []
+    fallidos = []
+    for nombres, fallidos_lote in resultados:
+        actualizados.extend(nombres)
+        fallidos.extend(fallidos_lote)
+
+    if fallidos and not actualizados:
+        raise HTTPException(status_code=500, detail=f"No se pudo actualizar ningún producto: {', '.join(fallidos)}")
+
+    return {
+        "status": "ok",
+        "mensaje": "No se pudieron actualizar todos los productos" if fallidos else "Monedas actualizadas correctamente",
+        "productos_actualizados": actualizados,
+        "productos_fallidos": fallidos
+    }
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException, Request
+import asyncio
+import logging
+import orjson
+
+from helpers import buscar_o_crear_producto, normalizar, obtener_contexto, obtener_indice_productos, solicitar
+from models import EntradaInteligenteRequest, ProductoEntradaInteligente
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.post("/entrada-inteligente")
+async def entrada_inteligente(data: EntradaInteligenteRequest, request: Request):
+    client = request.app.state.http
+    ctx = await obtener_contexto(data.usuario)
+    if not ctx:
+        raise HTTPException(status_code=403, detail="Usuario no autenticado")
+
+    base_url = ctx["base_url"]
+    headers = ctx["headers"]
+
+    if not data.stockAreaId:
+        almacenes_url = f"{base_url}/api/v1/administration/area"
+        res = await solicitar(client, "GET", almacenes_url, params={"type": "STOCK"}, headers=headers)
+        if res.status_code != 200:
+            raise HTTPException(status_code=500, detail="No se pudieron obtener los almacenes")
+
+        almacenes = orjson.loads(res.content).get("items", [])
+        return {
+            "status": "ok",
+            "mensaje": "Seleccione un área de stock",
+            "almacenes": [{"id": a["id"], "nombre": a["name"]} for a in almacenes]
+        }
+
+    # Un mismo nombre se resuelve una sola vez para no crear el producto dos veces,
+    # y sus cantidades se suman en una sola línea de entrada
+    unicos = {}
+    cantidades = {}
+    for prod in data.productos:
+        nombre_norm = normalizar(prod.nombre)
+        unicos.setdefault(nombre_norm, prod)
+        cantidades[nombre_norm] = cantidades.get(nombre_norm, 0) + prod.cantidad
+
+    indice = await obtener_indice_productos(client, base_url, headers)
+    sem = asyncio.Semaphore(16)
+
+    async def _resolver(prod: ProductoEntradaInteligente) -> int:
+        async with sem:
+            return await buscar_o_crear_producto(prod, indice, ctx["businessId"], client, base_url, headers)
+
+    # Se esperan todos los productos y se informa de todos los fallos a la vez
+    ids = await asyncio.gather(*[_resolver(p) for p in unicos.values()], return_exceptions=True)
+    # Los errores inesperados se registran aquí y al cliente solo le llega el producto
+    errores = []
+    for prod, e in zip(unicos.values(), ids):
+        if isinstance(e, HTTPException):
+            errores.append(e.detail)
+        elif isinstance(e, BaseException):
+            logger.error("Fallo al procesar '%s'", prod.nombre, exc_info=e)
+            errores.append(f"No se pudo procesar '{prod.nombre}'")
+    if errores:
+        raise HTTPException(status_code=500, detail="; ".join(errores))
+    ids_por_nombre = dict(zip(unicos, ids))
+
+    entrada_url = f"{base_url}/api/v1/administration/movement/bulk/entry"
+    entrada_payload = {
+        "products": [
+            {"productId": ids_por_nombre[nombre_norm], "quantity": cantidades[nombre_norm]}
+            for nombre_norm in unicos
+        ],
+        "stockAreaId": data.stockAreaId,
+        "continue": False
+    }
+    entrada_res = await solicitar(client, "POST", entrada_url, headers=headers, content=orjson.dumps(entrada_payload))
+    if entrada_res.status_code not in [200, 201]:
+        raise HTTPException(status_code=500, detail="No se pudo dar entrada a los productos")
+    procesados = [prod.nombre for prod in data.productos]
+
+    return {
+        "status": "ok",
+        "mensaje": "Productos procesados correctamente",
+        "productos_procesados": procesados
+    }
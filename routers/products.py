@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException, Request
+import orjson
+
+from helpers import inferir_categoria, obtener_contexto, obtener_o_crear_categoria, solicitar
+from models import Producto
+
+router = APIRouter()
+
+@router.post("/crear-producto-con-categoria")
+async def crear_producto_con_categoria(data: Producto, request: Request):
+    client = request.app.state.http
+    ctx = await obtener_contexto(data.usuario)
+    if not ctx:
+        raise HTTPException(status_code=403, detail="Usuario no autenticado")
+
+    base_url = ctx["base_url"]
+    headers = ctx["headers"]
+
+    categoria_nombre = data.categorias[0] if data.categorias else inferir_categoria(data.nombre)
+    categoria_id = await obtener_o_crear_categoria(categoria_nombre, ctx["businessId"], client, base_url, headers)
+
+    crear_payload = {
+        "type": data.tipo,
+        "name": data.nombre,
+        "prices": [
+            {
+                "price": data.precio,
+                "codeCurrency": data.moneda,
+                "systemPriceId": 1
+            }
+        ],
+        "images": [],
+        "salesCategoryId": categoria_id
+    }
+
+    crear_url = f"{base_url}/api/v1/administration/product"
+    crear_res = await solicitar(client, "POST", crear_url, headers=headers, content=orjson.dumps(crear_payload))
+    if crear_res.status_code not in [200, 201]:
+        raise HTTPException(status_code=500, detail="No se pudo crear el producto")
+
+    return {
+        "status": "ok",
+        "mensaje": f"Producto '{data.nombre}' creado en categoría '{categoria_nombre}'",
+        "respuesta": orjson.loads(crear_res.content)
+    }